@@ -0,0 +1,44 @@
+"""Library entry point.
+
+Importing it has no side effects and needs only the standard library,
+aiohttp is imported on the first HTTP download.
+
+    async with open_grib2('./data.grib2.bz2') as fp:
+        async for message in iter_messages(fp):
+            values = decode(message)
+"""
+from __future__ import annotations
+
+import os
+import asyncio
+from array import array
+from typing import TYPE_CHECKING, AsyncIterator
+
+from grib2file import GRIB2File
+from grib2 import GRIB2, GRIB2Message
+from fieldcache import decode as _decode
+
+if TYPE_CHECKING:
+    import aiohttp
+
+
+def open_grib2(path_or_url: str, session: aiohttp.ClientSession | None = None) -> GRIB2File:
+    """GRIB2 file by a local path, file:// or http(s):// URL, .bz2 is decompressed.
+
+    Must be called from a running event loop, use it as `async with`.
+    """
+    url = path_or_url
+    if '://' not in url:
+        url = 'file://' + os.path.abspath(url)
+
+    return GRIB2File(asyncio.get_running_loop(), url, session=session)
+
+
+async def iter_messages(fp: GRIB2File) -> AsyncIterator[GRIB2Message]:
+    async for message in GRIB2(fp).messages():
+        yield message
+
+
+def decode(message: GRIB2Message) -> array:
+    """Values of the message, rows from south to north, points from west to east."""
+    return _decode(message)
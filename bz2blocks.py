@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import os
+import bz2
+import asyncio
+
+
+# 0x314159265359 (BCD pi) - start of every compressed block
+BLOCK_MAGIC = 0x314159265359
+
+# 0x177245385090 (BCD sqrt(pi)) - end of stream marker
+EOS_MAGIC = 0x177245385090
+
+MAGIC_BITS = 48
+
+
+class ErrorBZ2Blocks(Exception): pass
+
+
+def _bits(data: bytes, start: int, end: int) -> int:
+    # Bits [start, end) of data as an integer
+    first = start // 8
+    last = (end + 7) // 8
+    value = int.from_bytes(data[first:last], 'big')
+    value >>= last * 8 - end
+    return value & ((1 << (end - start)) - 1)
+
+
+def _find_magic(data: bytes, magic: int) -> list[int]:
+    # Blocks are bit aligned, so look for every byte shift of the magic.
+    # For a shift > 0 the first and the last bytes are mixed with neighbours,
+    # only the 5 middle bytes can be searched as is.
+    positions = []
+    for shift in range(8):
+        window = (magic << (8 - shift)).to_bytes(7, 'big')
+        if shift == 0:
+            pattern, lead = window[:6], 0
+        else:
+            pattern, lead = window[1:6], 1
+
+        i = data.find(pattern)
+        while i >= 0:
+            start = (i - lead) * 8 + shift
+            end = start + MAGIC_BITS
+            if start >= 0 and end <= len(data) * 8 and _bits(data, start, end) == magic:
+                positions.append(start)
+            i = data.find(pattern, i + 1)
+
+    return positions
+
+
+def _block_stream(data: bytes, start: int, end: int) -> bytes:
+    # Wraps one compressed block into a standalone single block stream.
+    # The combined CRC of a single block stream is the CRC of this block.
+    crc = _bits(data, start + MAGIC_BITS, start + MAGIC_BITS + 32)
+    size = end - start
+    value = _bits(data, start, end)
+    value = (value << MAGIC_BITS) | EOS_MAGIC
+    value = (value << 32) | crc
+    size += MAGIC_BITS + 32
+    padding = -size % 8
+    value <<= padding
+    return b'BZh9' + value.to_bytes((size + padding) // 8, 'big')
+
+
+def split(data: bytes) -> list[bytes]:
+    if not data.startswith(b'BZh'):
+        raise ErrorBZ2Blocks('Not a bz2 stream')
+
+    blocks = _find_magic(data, BLOCK_MAGIC)
+    ends = _find_magic(data, EOS_MAGIC)
+    if not blocks or not ends:
+        raise ErrorBZ2Blocks('Block boundaries not found')
+
+    marks = sorted([(p, True) for p in blocks] + [(p, False) for p in ends])
+    if marks[-1][1]:
+        raise ErrorBZ2Blocks('End of stream not found')
+
+    result = []
+    for (start, is_block), (end, _) in zip(marks, marks[1:]):
+        if is_block:
+            result.append(_block_stream(data, start, end))
+
+    return result
+
+
+async def decompress(loop: asyncio.AbstractEventLoop, data: bytes) -> bytes:
+    """Decompresses bz2 data block by block in the default executor.
+
+    libbz2 releases the GIL, so blocks are decoded in parallel. Any failure
+    (e.g. a magic found inside of the compressed data) falls back to the
+    sequential decoder.
+    """
+    if (os.cpu_count() or 1) < 2:
+        return await loop.run_in_executor(None, bz2.decompress, data)
+
+    try:
+        streams = await loop.run_in_executor(None, split, data)
+    except ErrorBZ2Blocks:
+        return await loop.run_in_executor(None, bz2.decompress, data)
+
+    if len(streams) < 2:
+        return await loop.run_in_executor(None, bz2.decompress, data)
+
+    try:
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(None, bz2.decompress, s) for s in streams))
+    except (OSError, ValueError):
+        return await loop.run_in_executor(None, bz2.decompress, data)
+
+    return b''.join(chunks)
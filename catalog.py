@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from grib2 import GRIB2Message
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS messages (
+    url TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    run TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    reference_time TEXT NOT NULL,
+    discipline INTEGER NOT NULL,
+    category INTEGER NOT NULL,
+    parameter INTEGER NOT NULL,
+    surface INTEGER NOT NULL,
+    surface_value INTEGER NOT NULL,
+    time_range_unit INTEGER NOT NULL,
+    forecast_time INTEGER NOT NULL,
+    ni INTEGER NOT NULL,
+    nj INTEGER NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    mean REAL NOT NULL,
+    count INTEGER NOT NULL,
+    missing INTEGER NOT NULL,
+    low REAL NOT NULL,
+    high REAL NOT NULL,
+    histogram TEXT NOT NULL,
+    PRIMARY KEY (url, offset)
+);
+CREATE INDEX IF NOT EXISTS messages_parameter ON messages (discipline, category, parameter, max);
+CREATE INDEX IF NOT EXISTS messages_run ON messages (source, run, idx);
+'''
+
+
+class Catalog:
+    """SQLite inventory of decoded messages with their statistics.
+
+    Used from executor threads, a lock serializes the connection.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def add(self, source: str, run: datetime, idx: int, messages: list[GRIB2Message]):
+        rows = []
+        for m in messages:
+            url, offset = m.key
+            st = m.s7.statistics
+            rows.append((
+                url, offset, source, run.isoformat(), idx,
+                m.s1.reference_date.isoformat(),
+                m.s0.discipline, m.s4.category, m.s4.parameter_number,
+                m.s4.first_fixed_surface, m.s4.first_scaled_value_surface,
+                m.s4.time_range_unit, m.s4.forecast_time,
+                m.s3.ni, m.s3.nj,
+                st.min, st.max, st.mean, st.count, st.missing,
+                st.low, st.high, json.dumps(st.histogram),
+            ))
+
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO messages VALUES (%s)' % ', '.join('?' * 23), rows)
+
+    def exceeding(self, discipline: int, category: int, parameter: int,
+                  threshold: float) -> list[sqlite3.Row]:
+        # Messages of a parameter with values over threshold,
+        # e.g. precipitation (0, 1, 8) over X
+        with self._lock:
+            return self._db.execute(
+                'SELECT * FROM messages '
+                'WHERE discipline = ? AND category = ? AND parameter = ? AND max > ? '
+                'ORDER BY run, idx', (discipline, category, parameter, threshold,)).fetchall()
+
+    def empty(self) -> list[sqlite3.Row]:
+        # Constant fields, often empty or broken ones
+        with self._lock:
+            return self._db.execute(
+                'SELECT * FROM messages WHERE min = max OR count = 0 ORDER BY run, idx').fetchall()
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import os
+import sys
+import json
+import zlib
+import asyncio
+from array import array
+from datetime import datetime
+from dataclasses import dataclass
+
+from grib2 import GRIB2Message
+
+
+# Zarr v2 layout: <workdir>/<date>.zarr/<variable>/{.zarray,.zattrs,t.y.x}
+ZARR_FORMAT = 2
+
+
+@dataclass
+class ChunkShape:
+
+    # count of time steps (idx) in a chunk
+    time: int
+
+    # count of rows in a chunk
+    lat: int
+
+    # count of columns in a chunk
+    lon: int
+
+
+class ErrorChunkShape(Exception):
+
+    def __init__(self, size: int, shape: list[int]):
+        super().__init__(f'Wrong count of values {size} for shape {shape}')
+
+
+def variable_name(message: GRIB2Message) -> str:
+    # discipline_category_parameter_template_process_ then type, scale factor
+    # and value of both surfaces, e.g. an instantaneous field and an average
+    # of the same parameter go to different arrays
+    s4 = message.s4
+    return '_'.join(str(v) for v in (
+        message.s0.discipline,
+        s4.category,
+        s4.parameter_number,
+        s4.product_template,
+        s4.statistical_process,
+        s4.first_fixed_surface,
+        s4.first_scale_factor_surface,
+        s4.first_scaled_value_surface,
+        s4.second_fixed_surface,
+        s4.second_scale_factor_surface,
+        s4.second_scaled_value_surface,
+    ))
+
+
+def _write_json(path: str, value: dict):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as fp:
+        json.dump(value, fp, indent=4)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> dict:
+    with open(path) as fp:
+        return json.load(fp)
+
+
+class ChunkStore:
+    """time × lat × lon arrays in chunks, appended by time steps.
+
+    Values are expected in the canonical order of geometry.Grid,
+    lat from south to north and lon from west to east.
+
+    Every GRIB message type goes to its own array, the time index is idx
+    of dataset, so a point time series is a single chunk read when
+    the time chunk covers the whole range.
+
+    A time step is written by reading, updating and rewriting the time
+    chunk of every tile, so the I/O of a step grows with chunks.time,
+    e.g. ~12.6 MB per tile for 48 × 256 × 256.
+
+    Jobs of a run write to the same chunks, locks is one lock per array,
+    shared by the stores of the run.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, workdir: str, d: datetime,
+                 chunks: ChunkShape, compression: str = 'none', level: int = 1,
+                 locks: dict[str, asyncio.Lock] | None = None):
+        self._loop = loop
+        self._locks = {} if locks is None else locks
+        self._chunks = chunks
+        self._compression = compression
+        self._level = level
+
+        self._path = os.path.join(workdir, '%s.zarr' % datetime.strftime(d, '%Y-%m-%d_%H'))
+        os.makedirs(self._path, exist_ok=True)
+
+        zgroup = os.path.join(self._path, '.zgroup')
+        if not os.path.isfile(zgroup):
+            _write_json(zgroup, {'zarr_format': ZARR_FORMAT})
+            _write_json(os.path.join(self._path, '.zattrs'), {
+                'reference_time': d.isoformat(),
+            })
+
+    @property
+    def compressor(self) -> dict | None:
+        if self._compression == 'zlib':
+            return {'id': 'zlib', 'level': self._level}
+
+        return None
+
+    def _create(self, path: str, t: int, message: GRIB2Message):
+        os.makedirs(path, exist_ok=True)
+        _write_json(os.path.join(path, '.zarray'), {
+            'zarr_format': ZARR_FORMAT,
+            'shape': [t + 1, message.s3.nj, message.s3.ni],
+            'chunks': [self._chunks.time, self._chunks.lat, self._chunks.lon],
+            'dtype': '<f4',
+            'compressor': self.compressor,
+            'fill_value': 'NaN',
+            'order': 'C',
+            'filters': None,
+            'dimension_separator': '.',
+        })
+        south, west, north, east = message.grid.bbox
+        _write_json(os.path.join(path, '.zattrs'), {
+            '_ARRAY_DIMENSIONS': ['time', 'lat', 'lon'],
+            'bbox': [south, west, north, east],
+            'lat_step': message.grid.dj,
+            'lon_step': message.grid.di,
+        })
+
+    def _read_chunk(self, path: str, compressor: dict | None, size: int) -> array:
+        if not os.path.isfile(path):
+            return array('f', [float('nan')]) * size
+
+        chunk = array('f')
+        with open(path, 'rb') as fp:
+            data = fp.read()
+
+        if compressor:
+            data = zlib.decompress(data)
+
+        chunk.frombytes(data)
+        if sys.byteorder == 'big':
+            chunk.byteswap()
+
+        return chunk
+
+    def _write_chunk(self, path: str, compressor: dict | None, chunk: array):
+        if sys.byteorder == 'big':
+            chunk.byteswap()
+
+        data = chunk.tobytes()
+        if compressor:
+            data = zlib.compress(data, compressor['level'])
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as fp:
+            fp.write(data)
+        os.replace(tmp_path, path)
+
+    def _write(self, t: int, message: GRIB2Message, values: list[float]):
+        path = os.path.join(self._path, variable_name(message))
+        zarray_path = os.path.join(path, '.zarray')
+        if not os.path.isfile(zarray_path):
+            self._create(path, t, message)
+
+        meta = _read_json(zarray_path)
+        _, nj, ni = meta['shape']
+        ct, cy, cx = meta['chunks']
+        compressor = meta['compressor']
+
+        if len(values) != nj * ni:
+            raise ErrorChunkShape(len(values), meta['shape'])
+
+        if t >= meta['shape'][0]:
+            meta['shape'][0] = t + 1
+            _write_json(zarray_path, meta)
+
+        ti, tt = divmod(t, ct)
+        for yi, y0 in enumerate(range(0, nj, cy)):
+            for xi, x0 in enumerate(range(0, ni, cx)):
+                chunk_path = os.path.join(path, f'{ti}.{yi}.{xi}')
+                chunk = self._read_chunk(chunk_path, compressor, ct * cy * cx)
+
+                x1 = min(x0 + cx, ni)
+                for y in range(y0, min(y0 + cy, nj)):
+                    offset = (tt * cy + y - y0) * cx
+                    chunk[offset:offset + x1 - x0] = array('f', values[y * ni + x0:y * ni + x1])
+
+                self._write_chunk(chunk_path, compressor, chunk)
+
+    async def write(self, t: int, message: GRIB2Message, values: list[float]):
+        path = os.path.join(self._path, variable_name(message))
+        lock = self._locks.setdefault(path, asyncio.Lock())
+        async with lock:
+            await self._loop.run_in_executor(None, self._write, t, message, values)
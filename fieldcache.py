@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Executor
+
+from grib2 import GRIB2Message
+
+
+def decode(message: GRIB2Message) -> array:
+    # Values in the canonical order of the grid
+    return array('d', message.grid.reorder(message.s7.values()))
+
+
+class FieldCache:
+    """LRU of decoded fields by (file, message offset) within a memory budget.
+
+    A field is decoded on the first request, so only the fields
+    that sinks work on right now are in memory. Sinks of one message
+    share a single decode, concurrent requests for the same field wait
+    for the first one.
+    """
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, budget: int,
+                 executor: Executor | None = None):
+        self._loop = loop
+        self._budget = budget
+        self._executor = executor
+        self._size = 0
+        self._fields: OrderedDict[tuple, array] = OrderedDict()
+        self._pending: dict[tuple, asyncio.Future] = {}
+
+    def get(self, key: tuple) -> array | None:
+        values = self._fields.get(key)
+        if values is not None:
+            self._fields.move_to_end(key)
+
+        return values
+
+    def put(self, key: tuple, values: array):
+        size = values.itemsize * len(values)
+        if size > self._budget:
+            return
+
+        if key in self._fields:
+            old = self._fields.pop(key)
+            self._size -= old.itemsize * len(old)
+
+        self._fields[key] = values
+        self._size += size
+
+        while self._size > self._budget:
+            _, old = self._fields.popitem(last=False)
+            self._size -= old.itemsize * len(old)
+
+    async def values(self, message: GRIB2Message, pool: Executor | None = None) -> array:
+        key = message.key
+        values = self.get(key)
+        if values is not None:
+            return values
+
+        if key in self._pending:
+            return await asyncio.shield(self._pending[key])
+
+        future = self._loop.run_in_executor(pool or self._executor, decode, message)
+        self._pending[key] = future
+        try:
+            values = await future
+        finally:
+            del self._pending[key]
+
+        self.put(key, values)
+        return values
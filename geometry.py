@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import operator
+from array import array
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from grib2 import Section3
+
+
+# Flag Table 3.4
+SCAN_I_NEGATIVE = 0x80
+SCAN_J_POSITIVE = 0x40
+SCAN_J_CONSECUTIVE = 0x20
+SCAN_BOUSTROPHEDON = 0x10
+
+MISSING = 0xffffffff
+
+
+class ErrorGridSize(Exception):
+
+    def __init__(self, size: int, ni: int, nj: int):
+        super().__init__(f'Wrong count of values {size} for grid {ni}x{nj}')
+
+
+def _signed(value: int) -> int:
+    # GRIB2 keeps negative numbers as sign and magnitude
+    if value & 0x80000000:
+        return -(value & 0x7fffffff)
+
+    return value
+
+
+class Grid:
+    """Regular lat/lon grid (template 3.0) of a Section3.
+
+    Canonical order of points is rows from south to north,
+    points of a row from west to east.
+    """
+
+    @property
+    def s3(self) -> Section3:
+        return self._s3
+
+    @property
+    def ni(self) -> int:
+        return self._s3.ni
+
+    @property
+    def nj(self) -> int:
+        return self._s3.nj
+
+    @property
+    def scanning_mode(self) -> int:
+        return self._s3.scanning_mode
+
+    @property
+    def unit(self) -> float:
+        # degrees in one unit of la1, lo1, di etc
+        basic_angle = self._s3.values['basic_angle']
+        subdivisions = self._s3.values['subdivisions_of_basic_angle']
+        if basic_angle in (0, MISSING) or subdivisions in (0, MISSING):
+            return 1e-6
+
+        return basic_angle / subdivisions
+
+    @property
+    def la1(self) -> float:
+        return _signed(self._s3.la1) * self.unit
+
+    @property
+    def lo1(self) -> float:
+        return _signed(self._s3.lo1) * self.unit
+
+    @property
+    def la2(self) -> float:
+        return _signed(self._s3.la2) * self.unit
+
+    @property
+    def lo2(self) -> float:
+        return _signed(self._s3.lo2) * self.unit
+
+    @property
+    def di(self) -> float:
+        return self._s3.di * self.unit
+
+    @property
+    def dj(self) -> float:
+        return self._s3.dj * self.unit
+
+    @property
+    def bbox(self) -> tuple[float, float, float, float]:
+        # south, west, north, east, west < east.
+        # A grid across 0° (e.g. lo1 = 356.06, lo2 = 20.34) gets a negative west
+        if self.scanning_mode & SCAN_I_NEGATIVE:
+            west, east = self.lo2, self.lo1
+        else:
+            west, east = self.lo1, self.lo2
+
+        if west > east:
+            west -= 360
+
+        return (min(self.la1, self.la2), west, max(self.la1, self.la2), east,)
+
+    @property
+    def latitudes(self) -> array:
+        if self._latitudes is None:
+            south = self.bbox[0]
+            self._latitudes = array('d', (south + j * self.dj for j in range(self.nj)))
+
+        return self._latitudes
+
+    @property
+    def longitudes(self) -> array:
+        if self._longitudes is None:
+            west = self.bbox[1]
+            self._longitudes = array('d', (west + i * self.di for i in range(self.ni)))
+
+        return self._longitudes
+
+    @property
+    def identity(self) -> bool:
+        return self.scanning_mode & 0xf0 == SCAN_J_POSITIVE or self.ni * self.nj < 2
+
+    @property
+    def order(self) -> array:
+        # Index in the source data of every point in the canonical order
+        if self._order is None:
+            self._order = self._make_order()
+
+        return self._order
+
+    def __init__(self, s3: Section3):
+        self._s3 = s3
+        self._latitudes = None
+        self._longitudes = None
+        self._order = None
+        self._getter = None
+
+    def _make_order(self) -> array:
+        ni, nj, mode = self.ni, self.nj, self.scanning_mode
+        result = array('q')
+
+        if not mode & (SCAN_J_CONSECUTIVE | SCAN_BOUSTROPHEDON):
+            for j in range(nj):
+                b = j if mode & SCAN_J_POSITIVE else nj - 1 - j
+                row = range(b * ni, b * ni + ni)
+                result.extend(reversed(row) if mode & SCAN_I_NEGATIVE else row)
+
+            return result
+
+        for j in range(nj):
+            # position of the canonical row among scanned rows/columns
+            b = j if mode & SCAN_J_POSITIVE else nj - 1 - j
+            for i in range(ni):
+                a = i if not mode & SCAN_I_NEGATIVE else ni - 1 - i
+
+                if mode & SCAN_J_CONSECUTIVE:
+                    if mode & SCAN_BOUSTROPHEDON and a % 2:
+                        b_ = nj - 1 - b
+                    else:
+                        b_ = b
+                    result.append(a * nj + b_)
+
+                else:
+                    if mode & SCAN_BOUSTROPHEDON and b % 2:
+                        a = ni - 1 - a
+                    result.append(b * ni + a)
+
+        return result
+
+    def reorder(self, values: list[float]) -> list[float]:
+        # Source order to the canonical one
+        if len(values) != self.ni * self.nj:
+            raise ErrorGridSize(len(values), self.ni, self.nj)
+
+        if self.identity:
+            return values
+
+        if self._getter is None:
+            self._getter = operator.itemgetter(*self.order)
+
+        return list(self._getter(values))
+
+    def index(self, latitude: float, longitude: float) -> tuple[int, int]:
+        # Nearest canonical (row, column) of a point, longitude in any range
+        south, west, _, _ = self.bbox
+        return (round((latitude - south) / self.dj), round((longitude - west) % 360 / self.di),)
+
+
+class GridCache:
+    """LRU of grids by the raw bytes of Section3."""
+
+    def __init__(self, maxsize: int = 16):
+        self._maxsize = maxsize
+        self._grids: OrderedDict[bytes, Grid] = OrderedDict()
+
+    def get(self, key: bytes) -> Grid | None:
+        grid = self._grids.get(key)
+        if grid is not None:
+            self._grids.move_to_end(key)
+
+        return grid
+
+    def put(self, key: bytes, grid: Grid):
+        self._grids[key] = grid
+        self._grids.move_to_end(key)
+        while len(self._grids) > self._maxsize:
+            self._grids.popitem(last=False)
+
+
+# Shared among all messages and files of a process
+grids = GridCache()
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
 import struct
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
 from grib2file import GRIB2File
+from geometry import Grid, grids
 
 
 class CType:
@@ -118,6 +122,10 @@ class Section:
         self._fp = fp
         self._section_len = section_len
 
+    def release(self):
+        # Loaded values don't need the file, e.g. if the section is cached
+        self._fp = None
+
     async def load(self):
         for name, obj in self.fields:
             value = await obj.load(self._fp)
@@ -195,6 +203,11 @@ class Section1(Section):
             # 22-N Reserved
         )
 
+    @property
+    def reference_date(self) -> datetime:
+        v = self.values
+        return datetime(v['year'], v['month'], v['day'], v['hour'], v['minute'], v['second'])
+
 
 class Section3(Section):
 
@@ -280,6 +293,18 @@ class Section3(Section):
     def nj(self):
         return self.values['nj']
 
+    @property
+    def di(self) -> int:
+        return self.values['di']
+
+    @property
+    def dj(self) -> int:
+        return self.values['dj']
+
+    @property
+    def scanning_mode(self) -> int:
+        return self.values['scanning_mode']
+
 
 class Section4(Section):
 
@@ -335,6 +360,23 @@ class Section4(Section):
                 ('minute', UInt8(),),
                 # Second  ― Time of end of overall time interval
                 ('second', UInt8(),),
+                # n ― number of time range specifications describing the time intervals
+                ('time_ranges', UInt8(),),
+                # Total number of data values missing in statistical process
+                ('missing_in_statistical_process', UInt32(),),
+                # Statistical process used to calculate the processed field (see Code Table 4.10)
+                # of the first time range, the others are skipped
+                ('statistical_process', UInt8(),),
+                # Type of time increment between successive fields (see Code Table 4.11)
+                ('time_increment_type', UInt8(),),
+                # Indicator of unit of time for time range (see Code Table 4.4)
+                ('statistical_time_range_unit', UInt8(),),
+                # Length of the time range
+                ('statistical_time_range', UInt32(),),
+                # Indicator of unit of time for the increment between successive fields
+                ('time_increment_unit', UInt8(),),
+                # Time increment between successive fields
+                ('time_increment', UInt32(),),
             )
         }
 
@@ -347,6 +389,55 @@ class Section4(Section):
             ('product_template', Template(self.product_templates),),
         )
     
+    @property
+    def category(self) -> int:
+        return self.values['category']
+
+    @property
+    def parameter_number(self) -> int:
+        return self.values['parameter_number']
+
+    @property
+    def time_range_unit(self) -> int:
+        return self.values['time_range_unit']
+
+    @property
+    def forecast_time(self) -> int:
+        return self.values['forecast_time']
+
+    @property
+    def first_fixed_surface(self) -> int:
+        return self.values['first_fixed_surface']
+
+    @property
+    def first_scale_factor_surface(self) -> int:
+        return self.values['first_scale_factor_surface']
+
+    @property
+    def first_scaled_value_surface(self) -> int:
+        return self.values['first_scaled_value_surface']
+
+    @property
+    def second_fixed_surface(self) -> int:
+        return self.values['second_fixed_surfaced']
+
+    @property
+    def second_scale_factor_surface(self) -> int:
+        return self.values['second_scale_factor_surface']
+
+    @property
+    def second_scaled_value_surface(self) -> int:
+        return self.values['second_scaled_value_surface']
+
+    @property
+    def product_template(self) -> int:
+        return self.values['product_template']
+
+    @property
+    def statistical_process(self) -> int:
+        # Code Table 4.10, 255 (missing) for instantaneous fields
+        return self.values.get('statistical_process', 255)
+
     @property
     def year(self) -> int:
         return self.values.get('year', 0)
@@ -433,6 +524,120 @@ class Section5(Section):
         
         return result
 
+class ErrorS6Bitmap(Exception): pass
+
+
+# Positions of set bits of a byte, from the most significant one
+BYTE_BITS = tuple(tuple(i for i in range(8) if byte & (0x80 >> i)) for byte in range(256))
+
+
+class Section6(Section):
+
+    @property
+    def fields(self):
+        return (
+            # Bit-map indicator (See Table 6.0), 0 - a bit map applies,
+            # 254 - a previously defined bit map applies, 255 - no bit map
+            ('bitmap_indicator', UInt8(),),
+        )
+
+    @property
+    def bitmap_indicator(self) -> int:
+        return self.values['bitmap_indicator']
+
+    @property
+    def bitmap(self) -> bytes | None:
+        # A bit per grid point in the scan order, None if all points have values
+        return self._bitmap
+
+    @property
+    def points(self) -> int:
+        return self._points
+
+    @property
+    def missing(self) -> int:
+        # Count of grid points without values
+        return self._missing
+
+    def __init__(self, fp: GRIB2File, section_len: int, s3: Section3,
+                 previous: Section6 | None = None):
+        super().__init__(fp, section_len)
+        self._points = s3.values['data_point_count']
+        self._previous = previous
+        self._bitmap = None
+        self._missing = 0
+
+    async def load(self):
+        start = self._fp.tell()
+        await super().load()
+
+        if self.bitmap_indicator == 0:
+            end = self._fp.tell()
+            self._fp.seek(start + 1)
+            bitmap = await self._fp.read(self._section_len - 1)
+            self._fp.seek(end)
+
+            padding = len(bitmap) * 8 - self._points
+            present = (int.from_bytes(bitmap, 'big') >> max(padding, 0)).bit_count()
+            self._bitmap = bitmap
+            self._missing = self._points - present
+
+        elif self.bitmap_indicator == 254:
+            previous = self._previous
+            if previous is None or previous.bitmap is None or previous.points != self._points:
+                raise ErrorS6Bitmap('No previously defined bit map for %d points' % self._points)
+
+            self._bitmap = previous.bitmap
+            self._missing = previous.missing
+
+        self._previous = None
+
+    def scatter(self, values: list[float]) -> list[float]:
+        # Values of the present points to the whole grid, NaN for missing ones
+        if self._bitmap is None:
+            return values
+
+        result = [float('nan')] * self._points
+        positions = (
+            offset + i
+            for offset, byte in zip(range(0, self._points, 8), self._bitmap)
+            for i in BYTE_BITS[byte]
+        )
+        for position, value in zip(positions, values):
+            if position < self._points:
+                result[position] = value
+
+        return result
+
+
+HISTOGRAM_BITS = 4
+HISTOGRAM_BINS = 1 << HISTOGRAM_BITS
+
+
+@dataclass
+class Statistics:
+
+    min: float
+
+    max: float
+
+    mean: float
+
+    # count of values
+    count: int
+
+    # count of grid points without values (bitmap)
+    missing: int
+
+    # bounds of the histogram, the range of values of the packing
+    low: float
+
+    high: float
+
+    # HISTOGRAM_BINS counts of values, equal bins from low to high
+    histogram: list[int]
+
+
 # TODO: Needs to be removed. Add for testing, reference: https://github.com/NOAA-EMC/NCEPLIBS-g2c/blob/develop/src/int_power.c
 def power(x: float, y: int):
     if y < 0:
@@ -453,8 +658,23 @@ def power(x: float, y: int):
 
 class Section7:
 
-    def __init__(self, fp: GRIB2File, section_len: int, s5: Section5):
+    @property
+    def statistics(self) -> Statistics:
+        # Computed by values() in the same pass, or from packed integers
+        # only if the values weren't decoded
+        if self._statistics is None:
+            if self._bits == 0:
+                self._statistics = self._make_constant_statistics()
+            else:
+                self._statistics = self._make_statistics(self._raw())
+
+        return self._statistics
+
+    def __init__(self, fp: GRIB2File, section_len: int, s5: Section5, s6: Section6 | None = None):
         self._fp = fp
+        self._s6 = s6
+        self._missing = s6.missing if s6 else 0
+        self._statistics = None
 
         # TODO: Add support another encoding
         self._reference = s5.reference
@@ -473,6 +693,61 @@ class Section7:
     async def load(self):
         self._data = await self._fp.read(self._size)
 
+    def values(self) -> list[float]:
+        # Decodes the whole field at once, doesn't touch the cunks/next cursor.
+        # Every grid point gets a value, NaN if the bitmap marks it as missing
+        values = self._decode()
+        return self._s6.scatter(values) if self._s6 else values
+
+    def _decode(self) -> list[float]:
+        # Values of the packed points only
+        if self._bits == 0:
+            self._statistics = self._make_constant_statistics()
+            return [self._statistics.min] * self._points_number
+
+        raw = self._raw()
+        d, r, b = self._decimal_scale, self._reference, self._binary_scale
+        self._statistics = self._make_statistics(raw)
+        return [d * (r + value * b) for value in raw]
+
+    def _raw(self) -> list[int]:
+        # Packed integers
+        if self._step in (1, 2, 4):
+            fmt = {1: 'B', 2: 'H', 4: 'I'}[self._step]
+            return struct.unpack_from(f'>{self._points_number}{fmt}', self._data)
+
+        return [
+            int.from_bytes(self._data[offset:offset+self._step], 'big')
+            for offset in range(0, self._points_number * self._step, self._step)
+        ]
+
+    def _make_constant_statistics(self) -> Statistics:
+        value = self._decimal_scale * self._reference
+        return Statistics(
+            min=value, max=value, mean=value, count=self._points_number,
+            missing=self._missing, low=value, high=value,
+            histogram=[self._points_number] + [0] * (HISTOGRAM_BINS - 1))
+
+    def _make_statistics(self, raw: list[int]) -> Statistics:
+        # Values grow with packed integers, so everything is computed
+        # over raw integers by builtins, bins are the high bits
+        d, r, b = self._decimal_scale, self._reference, self._binary_scale
+        count = len(raw)
+
+        shift = self._bits - HISTOGRAM_BITS
+        bins = Counter(map(shift.__rrshift__, raw))
+
+        return Statistics(
+            min=d * (r + min(raw, default=0) * b),
+            max=d * (r + max(raw, default=0) * b),
+            mean=d * (r + (sum(raw) / count if count else 0) * b),
+            count=count,
+            missing=self._missing,
+            low=d * r,
+            high=d * (r + ((1 << self._bits) - 1) * b),
+            histogram=[bins.get(i, 0) for i in range(HISTOGRAM_BINS)],
+        )
+
     def cunks(self):
         # TODO: Fix it, can be lazy
         if self._bits == 0:
@@ -514,6 +789,10 @@ class GRIB2Message:
     def s3(self):
         return self._s3
 
+    @property
+    def grid(self) -> Grid:
+        return self._grid
+
     @property
     def s4(self):
         return self._s4
@@ -522,12 +801,25 @@ class GRIB2Message:
     def s5(self):
         return self._s5
     
+    @property
+    def s6(self):
+        return self._s6
+
     @property
     def s7(self):
         return self._s7
 
-    def __init__(self, fp: GRIB2File):
+    @property
+    def key(self) -> tuple[str, int]:
+        # Identity of the message among all files
+        return (self._fp.url, self._offset,)
+
+    def __init__(self, fp: GRIB2File, offset: int = 0, previous: GRIB2Message | None = None):
         self._fp = fp
+        self._offset = offset
+        self._s6 = None
+        # Section 6 of the previous message, for a previously defined bit map
+        self._previous_s6 = previous.s6 if previous else None
 
     async def load(self):
         self._s0 = Section0(self._fp)
@@ -538,21 +830,39 @@ class GRIB2Message:
                 self._s1 = Section1(self._fp, section_len)
                 await self._s1.load()
             elif section_number == 3:
-                self._s3 = Section3(self._fp, section_len)
-                await self._s3.load()
+                await self._load_grid(section_len)
             elif section_number == 4:
                 self._s4 = Section4(self._fp, section_len)
                 await self._s4.load()
             elif section_number == 5:
                 self._s5 = Section5(self._fp, section_len)
                 await self._s5.load()
+            elif section_number == 6:
+                self._s6 = Section6(self._fp, section_len, self._s3, self._previous_s6)
+                await self._s6.load()
             elif section_number == 7:
-                self._s7 = Section7(fp=self._fp, section_len=section_len, s5=self._s5)
+                self._s7 = Section7(fp=self._fp, section_len=section_len, s5=self._s5, s6=self._s6)
                 await self._s7.load()
                 break
             else:
                 self._fp.seek(self._fp.tell() + section_len)
 
+    async def _load_grid(self, section_len: int):
+        # The same grid is parsed once, messages share it by the raw section
+        start = self._fp.tell()
+        raw = await self._fp.read(section_len)
+        self._grid = grids.get(raw)
+
+        if self._grid is None:
+            self._fp.seek(start)
+            s3 = Section3(self._fp, section_len)
+            await s3.load()
+            s3.release()
+            self._grid = Grid(s3)
+            grids.put(raw, self._grid)
+
+        self._s3 = self._grid.s3
+
     async def _read_section_header(self):
         r_section_len = await self._fp.read(4)
         section_len = int.from_bytes(r_section_len, 'big')
@@ -568,10 +878,12 @@ class GRIB2:
         self._fp = fp
 
     async def messages(self):
+        m = None
         while True:
+            offset = self._fp.tell()
             start = await self._fp.read(4)
             if start == b'GRIB':
-                m = GRIB2Message(self._fp)
+                m = GRIB2Message(self._fp, offset, previous=m)
                 await m.load()
                 yield m
                 end = await self._fp.read(4)
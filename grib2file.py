@@ -1,10 +1,14 @@
 from __future__ import annotations
 
 import io
-import bz2
 import asyncio
-import aiohttp
 import tempfile
+from typing import TYPE_CHECKING
+
+import bz2blocks
+
+if TYPE_CHECKING:
+    import aiohttp
 
 
 class ErrorUnsuportedURL(Exception): pass
@@ -18,37 +22,69 @@ class ErrorGRIB2FielNotFount(Exception):
 
 class GRIB2File:
 
-    def __init__(self, loop: asyncio.AbstractEventLoop, url: str):
+    @property
+    def url(self) -> str:
+        return self._url
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, url: str,
+                 session: aiohttp.ClientSession | None = None):
         self._url = url
         self._loop = loop
+        self._session = session
 
     def _write_tmp(self, fp: io.BufferedWriter, data: bytes):
         fp.write(data)
         fp.flush()
 
+    def _read_file(self, path: str) -> bytes:
+        with open(path, 'rb') as fp:
+            return fp.read()
+
+    async def _open_bz2(self, data: bytes):
+        # Decompress once into memory, so seek/tell are O(1)
+        # and the loop is free to download the next files meanwhile
+        raw = await bz2blocks.decompress(self._loop, data)
+        self._tmp_fp = None
+        self._fp = io.BytesIO(raw)
+
+    async def _download(self, session: aiohttp.ClientSession) -> bytes:
+        async with session.get(self._url) as resp:
+            if resp.status != 200:
+                raise ErrorGRIB2FielNotFount(resp.status)
+
+            return await resp.read()
+
     async def open(self) -> GRIB2File:
         if self._url.startswith('http'):
             # TODO: Looks like an unnecessary dependency
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self._url) as resp:
-                    if resp.status != 200:
-                        raise ErrorGRIB2FielNotFount(resp.status)
-                    
-                    data = await resp.read()
-                    self._tmp_fp = tempfile.NamedTemporaryFile(mode='wb')
-                    await self._loop.run_in_executor(None, self._write_tmp, self._tmp_fp, data)
-
-                    if self._url.endswith('.bz2'):
-                        bz2_fp = bz2.open(filename=self._tmp_fp.name, mode='rb')
-                        self._fp = bz2_fp
-
-                    else:
-                        self._fp = open(self._tmp_fp.name, mode='rb')
+            if self._session:
+                data = await self._download(self._session)
+
+            else:
+                # Only the HTTP path needs it
+                import aiohttp
+
+                async with aiohttp.ClientSession() as session:
+                    data = await self._download(session)
+
+            if self._url.endswith('.bz2'):
+                await self._open_bz2(data)
+
+            else:
+                self._tmp_fp = tempfile.NamedTemporaryFile(mode='wb')
+                await self._loop.run_in_executor(None, self._write_tmp, self._tmp_fp, data)
+                self._fp = open(self._tmp_fp.name, mode='rb')
 
         elif self._url.startswith('file'):
             path = self._url[len('file://'):]
-            self._tmp_fp = None
-            self._fp = open(path, 'rb')
+
+            if path.endswith('.bz2'):
+                data = await self._loop.run_in_executor(None, self._read_file, path)
+                await self._open_bz2(data)
+
+            else:
+                self._tmp_fp = None
+                self._fp = open(path, 'rb')
 
         else:
             raise ErrorUnsuportedURL()
@@ -1,24 +1,34 @@
+from __future__ import annotations
 
 import os
 from datetime import datetime
 
-from PIL import Image
-
 from grib2 import GRIB2Message
 
 
-MAGIC = 200000
+def dump_to_image(idx: int, message: GRIB2Message, workdir: str, d: datetime,
+                  values: list[float] | None = None):
+    # Pillow is needed only for pictures
+    from PIL import Image
+
+    ni, nj = message.s3.ni, message.s3.nj
+    image = Image.new('RGB', (ni, nj,))
 
+    # Canonical rows go from south to north, the image from north to south
+    if values is None:
+        values = message.grid.reorder(message.s7.values())
 
-def dump_to_image(idx: int, message: GRIB2Message, workdir: str, d: datetime):
-    image = Image.new('RGB', (message.s3.ni+1, message.s3.nj+1,))
+    # Colors from min to max of the field
+    statistics = message.s7.statistics
+    low = statistics.min
+    scale = 255 / (statistics.max - low) if statistics.max > low else 0
 
-    for v in message.s7.cunks():
-        for x in range(message.s3.ni):
-            for y in range(message.s3.nj):
-                v = message.s7.next()
-                r = int((v / MAGIC) * 255)
-                image.putpixel((x, y,), (r, 0, 0,))
+    for row in range(min(nj, len(values) // ni)):
+        y = nj - 1 - row
+        for x in range(ni):
+            v = values[row * ni + x]
+            r = int((v - low) * scale) if v == v else 0
+            image.putpixel((x, y,), (r, 0, 0,))
 
-        filepath = os.path.join(workdir, f'{datetime.strftime(d, "%Y-%m-%d")}_{idx}.png')
-        image.save(filepath)
+    filepath = os.path.join(workdir, f'{datetime.strftime(d, "%Y-%m-%d_%H")}_{idx}.png')
+    image.save(filepath)
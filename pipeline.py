@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import itertools
+from urllib.parse import urlsplit
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Awaitable, Callable, Iterable
+
+from grib2file import GRIB2File, ErrorGRIB2FielNotFount
+from grib2 import GRIB2, GRIB2Message
+from catalog import Catalog
+
+if TYPE_CHECKING:
+    import aiohttp
+
+
+@dataclass
+class Job:
+
+    # number of item in dataset
+    idx: int
+
+    # date of source dataset
+    d: datetime
+
+    # URL of GRIB file, idx isn't substituted yet
+    url: str
+
+    # folder for results
+    workdir: str
+
+    # name of [source:*] config section, empty for [base]
+    source: str = ''
+
+    @property
+    def name(self) -> str:
+        if self.source:
+            return f'{self.source}/{datetime.strftime(self.d, "%Y-%m-%d:%H")}/{self.idx}'
+
+        return str(self.idx)
+
+    @property
+    def priority(self) -> tuple:
+        # The most recent dates first
+        return (-self.d.timestamp(), self.idx,)
+
+    @property
+    def host(self) -> str:
+        return urlsplit(self.url).netloc
+
+
+@dataclass
+class Decoded:
+
+    job: Job
+
+    messages: list[GRIB2Message]
+
+
+Sink = Callable[[Decoded], Awaitable[None]]
+
+
+class Pipeline:
+    """download -> decode -> sink, connected by bounded queues.
+
+    Every stage has its own count of workers, a full queue blocks
+    the previous stage, so the count of files in memory is limited by
+    workers and queue sizes.
+
+    The decode stage parses messages, values are decoded by sinks
+    on the first use (see FieldCache), statistics of the catalog come
+    from the same decode. Messages go to the catalog whatever the sinks
+    end with.
+
+    Jobs are downloaded by priority from a queue per host, download_workers
+    is a limit per host, so a slow host doesn't hold the others.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, sink: Sink,
+                 download_workers: int = 2, decode_workers: int = 1,
+                 sink_workers: int = 2, queue_size: int = 2,
+                 session: aiohttp.ClientSession | None = None,
+                 catalog: Catalog | None = None):
+        self._loop = loop
+        self._catalog = catalog
+        self._sink = sink
+        self._session = session
+
+        self._download_workers = download_workers
+        self._decode_workers = decode_workers
+        self._sink_workers = sink_workers
+
+        self._jobs: dict[str, asyncio.PriorityQueue] = {}
+        self._seq = itertools.count()
+        self._downloaded = asyncio.Queue(maxsize=queue_size)
+        self._decoded = asyncio.Queue(maxsize=queue_size)
+
+    def submit(self, job: Job):
+        jobs = self._jobs.setdefault(job.host, asyncio.PriorityQueue())
+        jobs.put_nowait((job.priority, next(self._seq), job,))
+
+    async def _download(self, jobs: asyncio.PriorityQueue):
+        while True:
+            _, _, job = await jobs.get()
+            url = job.url % { 'idx': job.idx, }
+            try:
+                grib_file = GRIB2File(self._loop, url, session=self._session)
+                await grib_file.open()
+                await self._downloaded.put((job, grib_file,))
+
+            except ErrorGRIB2FielNotFount as ex:
+                logging.error('Job %s has has been failed %s, link %s', job.name, ex, url)
+
+            except Exception:
+                logging.exception('Job %s has has been failed on download', job.name)
+
+            finally:
+                jobs.task_done()
+
+    async def _decode(self):
+        while True:
+            job, grib_file = await self._downloaded.get()
+            try:
+                try:
+                    messages = [m async for m in GRIB2(grib_file).messages()]
+                finally:
+                    grib_file.close()
+
+                await self._decoded.put(Decoded(job=job, messages=messages))
+
+            except Exception:
+                logging.exception('Job %s has has been failed on decode', job.name)
+
+            finally:
+                self._downloaded.task_done()
+
+    async def _write(self):
+        while True:
+            decoded = await self._decoded.get()
+            try:
+                await self._sink(decoded)
+                logging.info('Job %s has ben done', decoded.job.name)
+
+            except Exception:
+                logging.exception('Job %s has has been failed on write', decoded.job.name)
+
+            finally:
+                await self._add_to_catalog(decoded)
+                self._decoded.task_done()
+
+    async def _add_to_catalog(self, decoded: Decoded):
+        if not self._catalog:
+            return
+
+        job = decoded.job
+        try:
+            await self._loop.run_in_executor(
+                None, self._catalog.add, job.source, job.d, job.idx, decoded.messages)
+
+        except Exception:
+            logging.exception('Job %s has has been failed on catalog', job.name)
+
+    async def run(self, jobs: Iterable[Job]):
+        for job in jobs:
+            self.submit(job)
+
+        workers = [
+            *(self._loop.create_task(self._download(queue))
+              for queue in self._jobs.values() for _ in range(self._download_workers)),
+            *(self._loop.create_task(self._decode()) for _ in range(self._decode_workers)),
+            *(self._loop.create_task(self._write()) for _ in range(self._sink_workers)),
+        ]
+
+        try:
+            for queue in self._jobs.values():
+                await queue.join()
+
+            await self._downloaded.join()
+            await self._decoded.join()
+
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+            await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import os
+import asyncio
+import logging
+import functools
+import contextlib
+from configparser import ConfigParser
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from pipeline import Pipeline, Job, Decoded
+from fieldcache import FieldCache
+from wgf4 import WGF4, WGF4Packed, WGF4Headers
+from picture import dump_to_image
+from chunkstore import ChunkStore, ChunkShape
+from catalog import Catalog
+
+
+def _open_wgf4(loop: asyncio.AbstractEventLoop, config: ConfigParser, workdir: str,
+               d: datetime, run: datetime) -> WGF4:
+    compression = config.get('wgf4', 'compression', fallback='none')
+    if compression == 'none':
+        return WGF4(loop=loop, workdir=workdir, d=d, run=run)
+
+    return WGF4Packed(loop=loop, workdir=workdir, d=d, run=run, compression=compression,
+                      multiplier=config.getint('wgf4', 'multiplier', fallback=100),
+                      level=config.getint('wgf4', 'level', fallback=1),
+                      block_rows=config.getint('wgf4', 'block_rows', fallback=64))
+
+
+async def _dump_to_wgf4(loop: asyncio.AbstractEventLoop, config: ConfigParser,
+                        fields: FieldCache, decoded: Decoded):
+    d = decoded.job.d + timedelta(hours=decoded.job.idx)
+    async with _open_wgf4(loop=loop, config=config, workdir=decoded.job.workdir,
+                          d=d, run=decoded.job.d) as wgf4:
+        wgf4_headers = None
+        
+        for m in decoded.messages:
+            if not wgf4_headers:
+                # TODO: Can la1, la2 etc be different among messages?
+                # Coordinates in 1e-6 degrees, rows from south to north
+                south, west, north, east = m.grid.bbox
+                wgf4_headers = WGF4Headers(
+                            latitude1=round(south * 1e6), latitude2=round(north * 1e6),
+                            longtituge1=round(west * 1e6), longtituge2=round(east * 1e6),
+                            latitude=m.s3.ni, longtituge=m.s3.nj,
+                            multiplier=wgf4.multiplier)
+
+            await wgf4.write_values(await fields.values(m))
+        
+        await wgf4.set_headers(wgf4_headers)
+
+        if not wgf4.save():
+            logging.info('Job %s: %s has values of a newer run', decoded.job.name, d)
+
+
+async def _dump_to_picture(loop: asyncio.AbstractEventLoop, config: ConfigParser,
+                           fields: FieldCache, decoded: Decoded):
+    for message in decoded.messages:
+        values = await fields.values(message)
+        await loop.run_in_executor(None, dump_to_image,
+                                   decoded.job.idx, message, decoded.job.workdir, decoded.job.d, values)
+
+
+async def _dump_to_chunks(loop: asyncio.AbstractEventLoop, config: ConfigParser,
+                          fields: FieldCache, decoded: Decoded,
+                          locks: dict[str, asyncio.Lock] | None = None):
+    chunks = ChunkShape(
+        time=config.getint('chunks', 'time', fallback=6),
+        lat=config.getint('chunks', 'lat', fallback=256),
+        lon=config.getint('chunks', 'lon', fallback=256))
+    store = ChunkStore(loop=loop, workdir=decoded.job.workdir, d=decoded.job.d, chunks=chunks,
+                       compression=config.get('chunks', 'compression', fallback='none'),
+                       level=config.getint('chunks', 'level', fallback=1),
+                       locks=locks)
+
+    for message in decoded.messages:
+        await store.write(decoded.job.idx, message, await fields.values(message))
+
+
+SINKS = {
+    'WGF4': _dump_to_wgf4,
+    'picture': _dump_to_picture,
+    'zarr': _dump_to_chunks,
+}
+
+
+class ErrorUnknownTarget(Exception):
+
+    def __init__(self, target: str):
+        super().__init__(f'Unknown target {target}')
+
+
+class ErrorTargets(Exception):
+
+    def __init__(self, targets: list[str]):
+        super().__init__(f'Failed targets {", ".join(targets)}')
+
+
+def parse_targets(values: list[str] | None) -> list[str]:
+    # ['WGF4', 'picture'] or ['WGF4,picture']
+    result = [t for value in values or () for t in value.split(',') if t]
+    for t in result:
+        if t not in SINKS:
+            raise ErrorUnknownTarget(t)
+
+    return result
+
+
+def sink(loop: asyncio.AbstractEventLoop, config: ConfigParser,
+         fields: FieldCache, targets: list[str]):
+    # One decode of a message for all targets
+    sinks = {t: SINKS[t] for t in targets}
+    if 'zarr' in sinks:
+        # Locks of zarr arrays live as long as the run
+        sinks['zarr'] = functools.partial(_dump_to_chunks, locks={})
+
+    async def _sink(decoded: Decoded):
+        # The job is done when every target is settled, a failed one doesn't stop the others
+        results = await asyncio.gather(*(
+            sinks[t](loop=loop, config=config, fields=fields, decoded=decoded) for t in targets),
+            return_exceptions=True)
+
+        failed = []
+        for t, result in zip(targets, results):
+            if isinstance(result, Exception):
+                logging.error('Job %s has has been failed on %s', decoded.job.name, t, exc_info=result)
+                failed.append(t)
+
+        if failed:
+            raise ErrorTargets(failed)
+
+    return _sink
+
+
+def parse_date(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, '%Y-%m-%d:%H')
+    except ValueError:
+        return datetime.strptime(value, '%Y-%m-%d')
+
+
+def dates(value: str, step: int):
+    first, _, last = value.partition('..')
+    d = parse_date(first)
+    last = parse_date(last) if last else d
+
+    while d <= last:
+        yield d
+        d += timedelta(hours=step)
+
+
+def sources(config: ConfigParser):
+    sections = [name for name in config.sections() if name.startswith('source:')]
+    if not sections:
+        yield '', config['base']
+
+    for name in sections:
+        yield name[len('source:'):], config[name]
+
+
+def jobs(config: ConfigParser, date: str, count: str | None):
+    for source, section in sources(config):
+        workdir = config.get('base', 'workdir')
+        if source:
+            workdir = os.path.join(workdir, source)
+
+        os.makedirs(workdir, exist_ok=True)
+
+        r = int(section.get('range', fallback=count))
+        url_template = section.get('url_template')
+
+        for d in dates(date, section.getint('step', fallback=24)):
+            url = datetime.strftime(d, url_template)
+            for idx in range(0, r):
+                yield Job(idx=idx, d=d, url=url, workdir=workdir, source=source)
+
+
+async def run(config: ConfigParser, date: str, count: str | None, targets: list[str]):
+    """Processes the datasets of date (or FROM..TO) of all sources of config."""
+    download_workers = config.getint('pipeline', 'download_workers', fallback=2)
+
+    workdir = config.get('base', 'workdir')
+    os.makedirs(workdir, exist_ok=True)
+
+    catalog = None
+    if config.getboolean('catalog', 'enabled', fallback=True):
+        catalog = Catalog(os.path.join(workdir, config.get('catalog', 'filename', fallback='catalog.sqlite')))
+
+    loop = asyncio.get_running_loop()
+    decode_workers = config.getint('pipeline', 'decode_workers', fallback=1)
+
+    with ThreadPoolExecutor(max_workers=config.getint('base', 'workers')) as pool, \
+            ThreadPoolExecutor(max_workers=decode_workers) as decode_pool:
+        loop.set_default_executor(pool)
+        fields = FieldCache(loop=loop, executor=decode_pool,
+                            budget=config.getint('pipeline', 'cache_mb', fallback=512) * 2 ** 20)
+
+        async with contextlib.AsyncExitStack() as stack:
+            items = list(jobs(config, date, count))
+
+            # aiohttp is needed only for downloads
+            session = None
+            if any(job.url.startswith(('http://', 'https://',)) for job in items):
+                import aiohttp
+                connector = aiohttp.TCPConnector(limit_per_host=download_workers)
+                session = await stack.enter_async_context(aiohttp.ClientSession(connector=connector))
+
+            pipeline = Pipeline(
+                loop=loop, sink=sink(loop, config, fields, targets), session=session,
+                download_workers=download_workers,
+                decode_workers=decode_workers,
+                sink_workers=config.getint('pipeline', 'sink_workers', fallback=2),
+                queue_size=config.getint('pipeline', 'queue_size', fallback=2),
+                catalog=catalog)
+
+            try:
+                await pipeline.run(items)
+            finally:
+                if catalog:
+                    catalog.close()
+
+            logging.info('done')
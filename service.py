@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import os
+import re
+import sys
+import math
+import asyncio
+import logging
+import argparse
+import configparser
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime
+
+from aiohttp import web
+
+from wgf4 import WGF4, WGF4Packed, WGF4Reader
+
+
+# Folders of WGF4.__init__: dd.mm.YYYY_HH:00_timestamp
+RUN_FOLDER = re.compile(r'^\d{2}\.\d{2}\.\d{4}_\d{2}:00_(\d+)$')
+
+FILENAMES = (WGF4Packed.filename, WGF4.filename,)
+
+
+class ErrorBadQuery(Exception): pass
+
+
+class Index:
+    """WGF4 files of workdir by source and timestamp."""
+
+    def __init__(self, workdir: str):
+        self._workdir = workdir
+        self._runs: dict[str, list[tuple[int, str]]] = {}
+
+    def _scan_folder(self, folder: str, source: str, runs: dict):
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+
+                match = RUN_FOLDER.match(entry.name)
+                if not match:
+                    if not source:
+                        self._scan_folder(entry.path, entry.name, runs)
+                    continue
+
+                for filename in FILENAMES:
+                    path = os.path.join(entry.path, filename)
+                    if os.path.isfile(path):
+                        runs.setdefault(source, []).append((int(match.group(1)), path,))
+                        break
+
+    def scan(self):
+        runs = {}
+        if os.path.isdir(self._workdir):
+            self._scan_folder(self._workdir, '', runs)
+
+        for items in runs.values():
+            items.sort()
+
+        self._runs = runs
+
+    def runs(self, source: str, start: int, end: int) -> list[tuple[int, str]]:
+        # Runs with start <= timestamp <= end
+        items = self._runs.get(source, [])
+        first = bisect_left(items, start, key=lambda run: run[0])
+        last = bisect_right(items, end, key=lambda run: run[0])
+        return items[first:last]
+
+    def latest(self, source: str) -> tuple[int, str] | None:
+        items = self._runs.get(source)
+        return items[-1] if items else None
+
+
+class Handles:
+    """LRU of open (mmapped) readers, reopened if a file was replaced.
+
+    Evicted readers aren't closed, executor threads can still read them,
+    they are unmapped when the last reference is gone.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self._maxsize = maxsize
+        self._readers: OrderedDict[str, tuple[float, WGF4Reader]] = OrderedDict()
+
+    def get(self, path: str) -> WGF4Reader:
+        mtime = os.stat(path).st_mtime
+        item = self._readers.get(path)
+        if item is not None and item[0] == mtime:
+            self._readers.move_to_end(path)
+            return item[1]
+
+        reader = WGF4Reader(path)
+        self._readers[path] = (mtime, reader,)
+        self._readers.move_to_end(path)
+        while len(self._readers) > self._maxsize:
+            self._readers.popitem(last=False)
+
+        return reader
+
+    def close(self):
+        for _, reader in self._readers.values():
+            reader.close()
+
+        self._readers.clear()
+
+
+def longitudes(reader: WGF4Reader) -> tuple[float, float]:
+    # west, east of a file, west < east for grids across 0°
+    # (e.g. 356.06..20.34 of ICON-D2 goes to 356.06..380.34)
+    west, east = reader.headers.longtituge1 / 1e6, reader.headers.longtituge2 / 1e6
+    if east < west:
+        east += 360
+
+    return (west, east,)
+
+
+def locate(reader: WGF4Reader, latitude: float, longitude: float) -> tuple[int, int] | None:
+    # Nearest (row, column) of a point, rows from south to north, longitude in any range
+    h = reader.headers
+    south, north = h.latitude1 / 1e6, h.latitude2 / 1e6
+    west, east = longitudes(reader)
+    ni, nj = h.latitude, h.longtituge
+
+    row = round((latitude - south) / (north - south) * (nj - 1)) if nj > 1 else 0
+    column = 0
+    if ni > 1:
+        di = (east - west) / (ni - 1)
+        column = round((longitude - west) % 360 / di)
+        if abs(east - west + di - 360) < di / 2:
+            # A global grid, points after the east one are nearest to the west one
+            column %= ni
+
+    if 0 <= row < min(nj, reader.rows) and 0 <= column < ni:
+        return (row, column,)
+
+    return None
+
+
+class PointBatcher:
+    """Point lookups of one loop iteration go to one gather per file."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, handles: Handles):
+        self._loop = loop
+        self._handles = handles
+        self._pending: list[tuple[str, float, float, asyncio.Future]] = []
+        # The loop keeps only weak references to tasks
+        self._tasks: set[asyncio.Task] = set()
+
+    def lookup(self, path: str, latitude: float, longitude: float) -> asyncio.Future:
+        future = self._loop.create_future()
+        if not self._pending:
+            self._loop.call_soon(self._flush)
+
+        self._pending.append((path, latitude, longitude, future,))
+        return future
+
+    def _flush(self):
+        pending, self._pending = self._pending, []
+
+        by_path = {}
+        for path, latitude, longitude, future in pending:
+            by_path.setdefault(path, []).append((latitude, longitude, future,))
+
+        for path, items in by_path.items():
+            task = self._loop.create_task(self._gather(path, items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _values(self, reader: WGF4Reader, items: list) -> list[float | None]:
+        points = [locate(reader, latitude, longitude) for latitude, longitude, _ in items]
+        found = [p for p in points if p is not None]
+        values = iter(reader.values(found))
+        return [None if p is None else next(values) for p in points]
+
+    async def _gather(self, path: str, items: list):
+        try:
+            reader = self._handles.get(path)
+            values = await self._loop.run_in_executor(None, self._values, reader, items)
+
+        except Exception as ex:
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(ex)
+
+        else:
+            for (_, _, future), value in zip(items, values):
+                if not future.done():
+                    future.set_result(value)
+
+
+def _json_value(value: float | None) -> float | None:
+    if value is None or math.isnan(value):
+        return None
+
+    return value
+
+
+def _float(request: web.Request, name: str, default: float | None = None) -> float:
+    value = request.query.get(name)
+    if value is None:
+        if default is None:
+            raise ErrorBadQuery(f'{name} is required')
+        return default
+
+    try:
+        return float(value)
+    except ValueError:
+        raise ErrorBadQuery(f'{name} must be a number')
+
+
+def _timestamp(request: web.Request, name: str, default: int | None = None) -> int:
+    # Unix timestamp or ISO date, local time if without timezone like in WGF4 folders
+    value = request.query.get(name)
+    if value is None:
+        if default is None:
+            raise ErrorBadQuery(f'{name} is required')
+        return default
+
+    if value.isdigit():
+        return int(value)
+
+    try:
+        d = datetime.fromisoformat(value)
+    except ValueError:
+        raise ErrorBadQuery(f'{name} must be a timestamp or ISO date')
+
+    return int(d.timestamp())
+
+
+class Service:
+
+    def __init__(self, workdir: str, handles: int = 256, scan_interval: float = 10):
+        self._index = Index(workdir)
+        self._handles = Handles(maxsize=handles)
+        self._scan_interval = scan_interval
+        self._batcher = None
+        self._watcher = None
+
+    async def _watch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self._scan_interval)
+            try:
+                await loop.run_in_executor(None, self._index.scan)
+            except OSError:
+                logging.exception('Scan of workdir has been failed')
+
+    async def _startup(self, app: web.Application):
+        self._index.scan()
+        self._batcher = PointBatcher(asyncio.get_running_loop(), self._handles)
+        self._watcher = asyncio.get_running_loop().create_task(self._watch())
+
+    async def _cleanup(self, app: web.Application):
+        self._watcher.cancel()
+        await asyncio.gather(self._watcher, return_exceptions=True)
+        self._handles.close()
+
+    def _run(self, request: web.Request) -> tuple[int, str]:
+        source = request.query.get('source', '')
+        if 'time' in request.query:
+            # The run of this hour or the latest one before
+            runs = self._index.runs(source, 0, _timestamp(request, 'time'))
+            run = runs[-1] if runs else None
+        else:
+            run = self._index.latest(source)
+
+        if run is None:
+            raise web.HTTPNotFound(text='No data')
+
+        return run
+
+    @web.middleware
+    async def _errors(self, request: web.Request, handler):
+        try:
+            return await handler(request)
+        except ErrorBadQuery as ex:
+            raise web.HTTPBadRequest(text=str(ex))
+
+    async def point(self, request: web.Request) -> web.Response:
+        # /point?lat=&lon=[&time=][&source=], the latest run by default
+        latitude, longitude = _float(request, 'lat'), _float(request, 'lon')
+        t, path = self._run(request)
+        value = await self._batcher.lookup(path, latitude, longitude)
+        return web.json_response({'time': t, 'value': _json_value(value)})
+
+    async def series(self, request: web.Request) -> web.Response:
+        # /series?lat=&lon=[&from=][&hours=48][&source=]
+        latitude, longitude = _float(request, 'lat'), _float(request, 'lon')
+        now = int(datetime.now().timestamp()) // 3600 * 3600
+        start = _timestamp(request, 'from', now)
+        end = start + int(_float(request, 'hours', 48) * 3600)
+
+        runs = self._index.runs(request.query.get('source', ''), start, end)
+        values = await asyncio.gather(*(
+            self._batcher.lookup(path, latitude, longitude) for _, path in runs))
+
+        return web.json_response([
+            {'time': t, 'value': _json_value(v)} for (t, _), v in zip(runs, values)
+        ])
+
+    def _bbox(self, reader: WGF4Reader, south: float, west: float, north: float, east: float) -> dict:
+        # Longitudes of the query to the range of the file, east after west
+        grid_west, grid_east = longitudes(reader)
+        west = (west - grid_west + 180) % 360 + grid_west - 180
+        east = west + (east - west) % 360
+
+        first = locate(reader, max(south, reader.headers.latitude1 / 1e6), max(west, grid_west))
+        last = locate(reader, min(north, reader.headers.latitude2 / 1e6), min(east, grid_east))
+        if first is None or last is None:
+            return {'rows': []}
+
+        rows = [
+            [_json_value(v) for v in reader.row(row)[first[1]:last[1]+1]]
+            for row in range(first[0], last[0] + 1)
+        ]
+        return {'first': first, 'rows': rows}
+
+    async def bbox(self, request: web.Request) -> web.Response:
+        # /bbox?south=&west=&north=&east=[&time=][&source=], rows from south to north
+        south, west = _float(request, 'south'), _float(request, 'west')
+        north, east = _float(request, 'north'), _float(request, 'east')
+        t, path = self._run(request)
+
+        loop = asyncio.get_running_loop()
+        reader = self._handles.get(path)
+        result = await loop.run_in_executor(None, self._bbox, reader, south, west, north, east)
+        return web.json_response({'time': t, **result})
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._errors])
+        app.on_startup.append(self._startup)
+        app.on_cleanup.append(self._cleanup)
+        app.router.add_get('/point', self.point)
+        app.router.add_get('/series', self.series)
+        app.router.add_get('/bbox', self.bbox)
+        return app
+
+
+def create_app(config: configparser.ConfigParser) -> web.Application:
+    service = Service(
+        workdir=config.get('base', 'workdir'),
+        handles=config.getint('service', 'handles', fallback=256),
+        scan_interval=config.getfloat('service', 'scan_interval', fallback=10))
+    return service.app()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='WGF4 service')
+    parser.add_argument('-c', '--config',
+                        default='./fixture/config.ini', help='path to config file')
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.read(args.config)
+
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+
+    web.run_app(create_app(config),
+                host=config.get('service', 'host', fallback='127.0.0.1'),
+                port=config.getint('service', 'port', fallback=8080))
@@ -0,0 +1,40 @@
+"""Synthetic GRIB2 messages for tests: regular lat/lon grid, simple packing."""
+import struct
+
+
+def section(number: int, body: bytes) -> bytes:
+    return struct.pack('>IB', len(body) + 5, number) + body
+
+
+def message(ni: int = 5, nj: int = 4, values: list[int] | None = None, bits: int = 16,
+            reference: float = 0., decimal_scale: int = 0, scanning_mode: int = 0x40,
+            bitmap_indicator: int = 255, bitmap: bytes = b'', parameter: int = 8) -> bytes:
+    # values are packed integers of the present points in the scan order
+    if values is None:
+        values = list(range(ni * nj))
+
+    s1 = section(1, struct.pack('>HHBBBHBBBBBBB', 78, 255, 19, 1, 1, 2023, 11, 11, 12, 0, 0, 0, 1))
+
+    la1, la2 = (40000000, 41000000) if scanning_mode & 0x40 else (41000000, 40000000)
+    s3 = section(3, struct.pack('>BIBBH', 0, ni * nj, 0, 0, 0) + struct.pack(
+        '>BBIBIBIIIIIIIBIIIIB', 6, 0, 0, 0, 0, 0, 0, ni, nj, 0, 0xffffffff,
+        la1, 5000000, 48, la2, 5000000 + (ni - 1) * 1000000, 1000000, 1000000, scanning_mode))
+
+    s4 = section(4, struct.pack('>HH', 0, 0) + struct.pack(
+        '>BBBBBHBBIBBIBBI', 1, parameter, 2, 0, 0, 0, 0, 1, 0, 1, 0, 0, 255, 0, 0))
+
+    s5 = section(5, struct.pack('>IH', len(values), 0) + struct.pack(
+        '>fHHBB', reference, 0, decimal_scale, bits, 0))
+
+    s6 = section(6, bytes([bitmap_indicator]) + bitmap)
+
+    s7 = section(7, b''.join(v.to_bytes(bits // 8, 'big') for v in values) if bits else b'')
+
+    body = s1 + s3 + s4 + s5 + s6 + s7 + b'7777'
+    return b'GRIB' + struct.pack('>HBBQ', 0, 0, 2, 16 + len(body)) + body
+
+
+def bitmap(present: list[bool]) -> bytes:
+    bits = ''.join('1' if p else '0' for p in present)
+    bits += '0' * (-len(bits) % 8)
+    return int(bits, 2).to_bytes(len(bits) // 8, 'big')
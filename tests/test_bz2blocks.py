@@ -0,0 +1,92 @@
+import bz2
+import random
+import asyncio
+
+import pytest
+
+import bz2blocks
+from bz2blocks import BLOCK_MAGIC, EOS_MAGIC, ErrorBZ2Blocks, split
+
+
+def _data(size: int, seed: int = 0) -> bytes:
+    # Compressible but not trivial, level 1 gives a block per 100k
+    rnd = random.Random(seed)
+    words = [bytes(rnd.randrange(97, 123) for _ in range(rnd.randrange(2, 9))) for _ in range(512)]
+    result = bytearray()
+    while len(result) < size:
+        result += rnd.choice(words) + b' '
+    return bytes(result[:size])
+
+
+def _decompress(data: bytes) -> bytes:
+    async def _run():
+        return await bz2blocks.decompress(asyncio.get_running_loop(), data)
+
+    return asyncio.run(_run())
+
+
+@pytest.fixture(autouse=True)
+def cpus(monkeypatch):
+    # The parallel path is taken on any machine
+    monkeypatch.setattr(bz2blocks.os, 'cpu_count', lambda: 4)
+
+
+@pytest.mark.parametrize('shift', range(8))
+@pytest.mark.parametrize('magic', [BLOCK_MAGIC, EOS_MAGIC])
+def test_find_magic(magic, shift):
+    data = bytes(3) + ((magic << 16) >> shift).to_bytes(8, 'big') + bytes(3)
+    assert bz2blocks._find_magic(data, magic) == [24 + shift]
+
+
+def test_split_multi_block():
+    data = _data(450_000)
+    compressed = bz2.compress(data, 1)
+
+    streams = split(compressed)
+    assert len(streams) == 5
+    assert b''.join(map(bz2.decompress, streams)) == data
+    assert _decompress(compressed) == data
+
+
+def test_split_bit_shifts():
+    # Blocks of a stream end on any bit, the splitting should cover them
+    compressed = bz2.compress(_data(450_000, seed=1), 1)
+    shifts = {p % 8 for p in bz2blocks._find_magic(compressed, BLOCK_MAGIC)}
+    assert shifts - {0}
+
+
+def test_split_concatenated_streams():
+    first, second = _data(250_000, seed=2), _data(150_000, seed=3)
+    compressed = bz2.compress(first, 1) + bz2.compress(second, 1)
+
+    assert len(split(compressed)) == 5
+    assert _decompress(compressed) == first + second
+
+
+def test_split_errors():
+    with pytest.raises(ErrorBZ2Blocks):
+        split(b'not bz2')
+
+    with pytest.raises(ErrorBZ2Blocks):
+        split(bz2.compress(_data(1000))[:-10])
+
+
+def test_fallback_on_false_magic(monkeypatch):
+    data = _data(250_000, seed=4)
+    compressed = bz2.compress(data, 1)
+    find_magic = bz2blocks._find_magic
+
+    def _find_false_magic(data: bytes, magic: int) -> list[int]:
+        # A magic inside of the compressed data of the first block
+        positions = find_magic(data, magic)
+        if magic == BLOCK_MAGIC:
+            positions.append(positions[0] + 8000)
+        return positions
+
+    monkeypatch.setattr(bz2blocks, '_find_magic', _find_false_magic)
+    assert _decompress(compressed) == data
+
+
+def test_small_stream():
+    data = _data(1000)
+    assert _decompress(bz2.compress(data)) == data
@@ -0,0 +1,81 @@
+import pytest
+
+from grib2 import Section3
+from geometry import Grid, ErrorGridSize
+
+
+def _s3(ni: int = 3, nj: int = 2, scanning_mode: int = 0x40,
+        la1: int = 40000000, lo1: int = 5000000, la2: int = 41000000, lo2: int = 7000000,
+        di: int = 1000000, dj: int = 1000000) -> Section3:
+    s3 = Section3(None, 0)
+    s3.values.update({
+        'ni': ni, 'nj': nj, 'scanning_mode': scanning_mode,
+        'la1': la1, 'lo1': lo1, 'la2': la2, 'lo2': lo2, 'di': di, 'dj': dj,
+        'basic_angle': 0, 'subdivisions_of_basic_angle': 0xffffffff,
+    })
+    return s3
+
+
+# Canonical order of a 3 × 2 grid is [0, 1, 2, 10, 11, 12],
+# 10 × row (south to north) + column (west to east)
+@pytest.mark.parametrize('scanning_mode, source', [
+    # +i, +j
+    (0x40, [0, 1, 2, 10, 11, 12]),
+    # +i, -j
+    (0x00, [10, 11, 12, 0, 1, 2]),
+    # -i, -j
+    (0x80, [12, 11, 10, 2, 1, 0]),
+    # -i, +j
+    (0xc0, [2, 1, 0, 12, 11, 10]),
+    # +i, +j, j consecutive
+    (0x60, [0, 10, 1, 11, 2, 12]),
+    # +i, -j, j consecutive
+    (0x20, [10, 0, 11, 1, 12, 2]),
+    # -i, +j, j consecutive
+    (0xe0, [2, 12, 1, 11, 0, 10]),
+    # +i, +j, boustrophedon
+    (0x50, [0, 1, 2, 12, 11, 10]),
+    # +i, -j, boustrophedon
+    (0x10, [10, 11, 12, 2, 1, 0]),
+    # -i, +j, boustrophedon
+    (0xd0, [2, 1, 0, 10, 11, 12]),
+    # +i, +j, j consecutive, boustrophedon
+    (0x70, [0, 10, 11, 1, 2, 12]),
+])
+def test_reorder(scanning_mode, source):
+    grid = Grid(_s3(scanning_mode=scanning_mode))
+    assert grid.reorder(source) == [0, 1, 2, 10, 11, 12]
+    assert grid.identity == (scanning_mode == 0x40)
+
+
+def test_reorder_size():
+    with pytest.raises(ErrorGridSize):
+        Grid(_s3(scanning_mode=0x00)).reorder([0, 1, 2])
+
+    with pytest.raises(ErrorGridSize):
+        Grid(_s3()).reorder([0, 1, 2])
+
+
+@pytest.mark.parametrize('kwargs, bbox', [
+    ({}, (40, 5, 41, 7)),
+    # -j, la1 is the north
+    ({'scanning_mode': 0x00, 'la1': 41000000, 'la2': 40000000}, (40, 5, 41, 7)),
+    # -i, lo1 is the east
+    ({'scanning_mode': 0xc0, 'lo1': 7000000, 'lo2': 5000000}, (40, 5, 41, 7)),
+    # sign and magnitude
+    ({'la1': 0x80000000 | 1000000, 'la2': 0, 'lo1': 0x80000000 | 1000000, 'lo2': 1000000},
+     (-1, -1, 0, 1)),
+    # across 0°, like ICON-D2
+    ({'lo1': 359000000, 'lo2': 1000000}, (40, -1, 41, 1)),
+    ({'scanning_mode': 0xc0, 'lo1': 1000000, 'lo2': 359000000}, (40, -1, 41, 1)),
+])
+def test_bbox(kwargs, bbox):
+    assert Grid(_s3(**kwargs)).bbox == pytest.approx(bbox)
+
+
+def test_index_across_0():
+    grid = Grid(_s3(lo1=359000000, lo2=1000000))
+    assert list(grid.longitudes) == pytest.approx([-1, 0, 1])
+    assert grid.index(41, 359) == (1, 0)
+    assert grid.index(41, -1) == (1, 0)
+    assert grid.index(40, 1) == (0, 2)
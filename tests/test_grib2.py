@@ -0,0 +1,82 @@
+import math
+import asyncio
+
+import pytest
+
+from api import open_grib2, iter_messages, decode
+from grib2 import ErrorS6Bitmap
+from gribs import message, bitmap
+
+
+# Every other point of a 5 × 4 grid
+PRESENT = [i % 2 == 0 for i in range(20)]
+
+
+def _decode(tmp_path, data: bytes) -> list[tuple[list[float], object]]:
+    path = tmp_path / 'data.grib2'
+    path.write_bytes(data)
+
+    async def _run():
+        async with open_grib2(str(path)) as fp:
+            return [(list(decode(m)), m.s7.statistics) async for m in iter_messages(fp)]
+
+    return asyncio.run(_run())
+
+
+def _same(first: list[float], second: list[float]) -> bool:
+    return len(first) == len(second) and all(
+        math.isnan(a) if math.isnan(b) else a == b for a, b in zip(first, second))
+
+
+def test_bitmap(tmp_path):
+    [(values, statistics)] = _decode(tmp_path, message(
+        values=list(range(10)), bitmap_indicator=0, bitmap=bitmap(PRESENT)))
+
+    expected = [float(i // 2) if present else math.nan for i, present in enumerate(PRESENT)]
+    assert _same(values, expected)
+    assert (statistics.count, statistics.missing, statistics.max) == (10, 10, 9)
+
+
+def test_bitmap_reordered(tmp_path):
+    # -j scan, the first scanned row is the north one
+    [(values, _)] = _decode(tmp_path, message(
+        values=list(range(10)), bitmap_indicator=0, bitmap=bitmap(PRESENT), scanning_mode=0x00))
+
+    scanned = [float(i // 2) if present else math.nan for i, present in enumerate(PRESENT)]
+    expected = [v for row in reversed(range(4)) for v in scanned[row * 5:row * 5 + 5]]
+    assert _same(values, expected)
+
+
+def test_constant(tmp_path):
+    [(values, statistics)] = _decode(tmp_path, message(values=[0] * 20, bits=0, reference=3.))
+    assert values == [3.] * 20
+    assert (statistics.min, statistics.max, statistics.count) == (3, 3, 20)
+
+
+def test_constant_bitmap(tmp_path):
+    [(values, statistics)] = _decode(tmp_path, message(
+        values=[0] * 10, bits=0, reference=3., bitmap_indicator=0, bitmap=bitmap(PRESENT)))
+
+    assert _same(values, [3. if present else math.nan for present in PRESENT])
+    assert (statistics.count, statistics.missing) == (10, 10)
+
+
+def test_previous_bitmap(tmp_path):
+    first = message(values=list(range(10)), bitmap_indicator=0, bitmap=bitmap(PRESENT))
+    second = message(values=list(range(10, 20)), bitmap_indicator=254)
+    [(values, _), (previous_values, statistics)] = _decode(tmp_path, first + second)
+
+    assert _same(previous_values, [v + 10 if present else v for v, present in zip(values, PRESENT)])
+    assert statistics.missing == 10
+
+
+@pytest.mark.parametrize('first', [
+    b'',
+    message(),
+    message(ni=4, nj=4, values=list(range(8)), bitmap_indicator=0, bitmap=bitmap(PRESENT[:16])),
+], ids=['first', 'no-bitmap', 'other-size'])
+def test_previous_bitmap_missing(tmp_path, first):
+    # No previous message, a previous one without a bitmap, or of another size
+    second = message(values=list(range(10)), bitmap_indicator=254)
+    with pytest.raises(ErrorS6Bitmap):
+        _decode(tmp_path, first + second)
@@ -0,0 +1,45 @@
+import asyncio
+from datetime import datetime
+
+import grib2
+from catalog import Catalog
+from pipeline import Pipeline, Job, Decoded
+from gribs import message
+
+
+D = datetime(2023, 11, 11, 12)
+
+
+def _run(tmp_path, sink) -> list:
+    path = tmp_path / 'data.grib2'
+    path.write_bytes(message(parameter=8) + message(parameter=52))
+
+    async def _run():
+        pipeline = Pipeline(loop=asyncio.get_running_loop(), sink=sink, catalog=catalog)
+        await pipeline.run([Job(idx=0, d=D, url=f'file://{path}', workdir=str(tmp_path))])
+
+    with Catalog(str(tmp_path / 'catalog.sqlite')) as catalog:
+        asyncio.run(_run())
+        return catalog.exceeding(0, 1, 8, -1) + catalog.exceeding(0, 1, 52, -1)
+
+
+def test_catalog_on_failed_sink(tmp_path):
+    async def _sink(decoded: Decoded):
+        raise RuntimeError('sink')
+
+    rows = _run(tmp_path, _sink)
+    assert [(row['parameter'], row['count'], row['max']) for row in rows] == [(8, 20, 19), (52, 20, 19)]
+
+
+def test_catalog_without_decode(tmp_path, monkeypatch):
+    # Statistics of the catalog don't need values of the field
+    def _decode(self):
+        raise AssertionError('decoded')
+
+    monkeypatch.setattr(grib2.Section7, '_decode', _decode)
+
+    async def _sink(decoded: Decoded):
+        pass
+
+    rows = _run(tmp_path, _sink)
+    assert [(row['min'], row['max'], row['mean']) for row in rows] == [(0, 19, 9.5)] * 2
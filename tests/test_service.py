@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from service import Service
+from wgf4 import WGF4, WGF4Packed, WGF4Headers
+
+
+# 5 columns from 4°W to 4°E by 2°, 3 rows from 50°N to 52°N,
+# a grid across 0° like ICON-D2
+HEADERS = WGF4Headers(latitude1=50000000, latitude2=52000000,
+                      longtituge1=-4000000, longtituge2=4000000,
+                      latitude=5, longtituge=3, multiplier=100)
+
+# 4 columns from 0° to 270° by 90°, global like CFS
+GLOBAL_HEADERS = WGF4Headers(latitude1=-90000000, latitude2=90000000,
+                             longtituge1=0, longtituge2=270000000,
+                             latitude=4, longtituge=3, multiplier=100)
+
+RUN = datetime(2023, 11, 11, 12)
+
+
+def _write(workdir: str, d: datetime, shift: int, compression: str, headers: WGF4Headers = HEADERS):
+    # value = shift + 10 * row + column
+    async def _run():
+        loop = asyncio.get_running_loop()
+        if compression == 'none':
+            wgf4 = WGF4(loop=loop, workdir=workdir, d=d)
+        else:
+            wgf4 = WGF4Packed(loop=loop, workdir=workdir, d=d, compression=compression)
+
+        async with wgf4:
+            await wgf4.write_values([
+                shift + 10 * row + column
+                for row in range(headers.longtituge) for column in range(headers.latitude)
+            ])
+            await wgf4.set_headers(headers)
+            wgf4.save()
+
+    asyncio.run(_run())
+
+
+@pytest.fixture(params=['none', 'zlib'])
+def workdir(request, tmp_path):
+    _write(str(tmp_path), RUN, 0, request.param)
+    _write(str(tmp_path), RUN + timedelta(hours=1), 100, request.param)
+    return str(tmp_path)
+
+
+def _get(workdir: str, *queries: str) -> list:
+    async def _run():
+        async with TestClient(TestServer(Service(workdir).app())) as client:
+            result = []
+            for query in queries:
+                response = await client.get(query)
+                assert response.status == 200, await response.text()
+                result.append(await response.json())
+            return result
+
+    return asyncio.run(_run())
+
+
+def test_point(workdir):
+    t = int((RUN + timedelta(hours=1)).timestamp())
+    east, west, outside = _get(workdir, '/point?lat=51&lon=2', '/point?lat=51&lon=358',
+                               '/point?lat=60&lon=0')
+
+    assert east == {'time': t, 'value': 113}
+    assert west == {'time': t, 'value': 111}
+    assert outside == {'time': t, 'value': None}
+
+
+def test_point_at_time(workdir):
+    [result] = _get(workdir, f'/point?lat=50&lon=-4&time={RUN.isoformat()}')
+    assert result == {'time': int(RUN.timestamp()), 'value': 0}
+
+
+def test_series(workdir):
+    [result] = _get(workdir, f'/series?lat=52&lon=0&from={int(RUN.timestamp())}&hours=2')
+    assert [item['value'] for item in result] == [22, 122]
+
+
+def test_bbox(workdir):
+    [result] = _get(workdir, '/bbox?south=50&west=358&north=51&east=2')
+    assert result['first'] == [0, 1]
+    assert result['rows'] == [[101, 102, 103], [111, 112, 113]]
+
+
+def test_point_global(tmp_path):
+    _write(str(tmp_path), RUN, 0, 'none', GLOBAL_HEADERS)
+    results = _get(str(tmp_path), '/point?lat=0&lon=359', '/point?lat=0&lon=-1',
+                   '/point?lat=0&lon=330', '/point?lat=0&lon=300', '/point?lat=0&lon=90')
+
+    assert [result['value'] for result in results] == [10, 10, 10, 13, 11]
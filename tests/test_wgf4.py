@@ -0,0 +1,71 @@
+import math
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from wgf4 import WGF4, WGF4Packed, WGF4Headers, WGF4Reader, ErrorWGF4Multiplier, quantize
+
+
+D = datetime(2023, 11, 11, 12)
+
+
+def _write(workdir: str, values: list[float], ni: int, **kwargs) -> str:
+    async def _run():
+        loop = asyncio.get_running_loop()
+        if kwargs.get('compression', 'none') == 'none':
+            wgf4 = WGF4(loop=loop, workdir=workdir, d=D)
+        else:
+            wgf4 = WGF4Packed(loop=loop, workdir=workdir, d=D, **kwargs)
+
+        async with wgf4:
+            await wgf4.write_values(values)
+            await wgf4.set_headers(WGF4Headers(
+                latitude1=0, latitude2=1000000, longtituge1=0, longtituge2=1000000,
+                latitude=ni, longtituge=len(values) // ni, multiplier=wgf4.multiplier))
+            wgf4.save()
+            return wgf4._path
+
+    return asyncio.run(_run())
+
+
+def _read(path: str) -> list[float]:
+    with WGF4Reader(path) as reader:
+        return [v for row in range(reader.rows) for v in reader.row(row)]
+
+
+def _same(first: list[float], second: list[float]) -> bool:
+    return len(first) == len(second) and all(
+        math.isnan(a) if math.isnan(b) else a == pytest.approx(b) for a, b in zip(first, second))
+
+
+@pytest.mark.parametrize('values, itemsize', [
+    # int16
+    ([0., 1.5, -2.25, float('nan'), 327.66, -327.66], 2),
+    # int32
+    ([0., 1000., -1000.5, float('nan'), 2e7, -2e7], 4),
+])
+@pytest.mark.parametrize('compression', ['none', 'zlib', 'lzma'])
+def test_round_trip(tmp_path, compression, values, itemsize):
+    kwargs = {} if compression == 'none' else {'compression': compression, 'block_rows': 2}
+    path = _write(str(tmp_path), values * 3, 3, **kwargs)
+    assert _same(_read(path), values * 3)
+
+    with WGF4Reader(path) as reader:
+        assert reader.rows == 6
+        assert _same(reader.values([(5, 2), (0, 1)]), [values[5], values[1]])
+        if compression != 'none':
+            assert reader._itemsize == itemsize
+
+
+def test_quantize_missing():
+    q = quantize([1., float('nan'), float('inf'), -float('inf')], 100)
+    q.byteswap()
+    assert q.typecode == 'h'
+    assert list(q) == [100, -2 ** 15, -2 ** 15, -2 ** 15]
+
+
+@pytest.mark.parametrize('values', [[3e7], [float('nan'), 1e307], [1e308, float('inf')]])
+def test_quantize_overflow(values):
+    with pytest.raises(ErrorWGF4Multiplier):
+        quantize(values, 100)
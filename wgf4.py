@@ -1,9 +1,17 @@
+from __future__ import annotations
+
 
 import os
+import sys
+import math
+import lzma
+import mmap
+import zlib
 import tempfile
 import shutil
 import struct
 import asyncio
+from array import array
 from datetime import datetime
 from io import BufferedWriter
 from dataclasses import dataclass
@@ -34,16 +42,16 @@ class WGF4Headers:
     multiplier: int
 
     def dump(self, fp: BufferedWriter):
-        r_latitude1 = struct.pack('>I', self.latitude1)
+        r_latitude1 = struct.pack('>i', self.latitude1)
         fp.write(r_latitude1)
 
-        r_latitude2 = struct.pack('>I', self.latitude2)
+        r_latitude2 = struct.pack('>i', self.latitude2)
         fp.write(r_latitude2)
 
-        r_longtituge1 = struct.pack('>I', self.longtituge1)
+        r_longtituge1 = struct.pack('>i', self.longtituge1)
         fp.write(r_longtituge1)
 
-        r_longtituge2 = struct.pack('>I', self.longtituge2)
+        r_longtituge2 = struct.pack('>i', self.longtituge2)
         fp.write(r_longtituge2)
 
         r_latitude = struct.pack('>I', self.latitude)
@@ -55,11 +63,100 @@ class WGF4Headers:
         r_multiplier = struct.pack('>I', self.multiplier)
         fp.write(r_multiplier)
 
+    @classmethod
+    def load(cls, data: bytes) -> WGF4Headers:
+        return cls(*struct.unpack_from('>4i3I', data))
+
+
+# headers + nodata value
+HEADERS_SIZE = 7 * 4 + 4
+
+# Unix timestamp of the run that wrote a folder, runs of a range
+# overlap by valid time, a folder keeps values of the newest one
+RUN_FILENAME = 'RUN'
+
+# Packed variant, goes after the headers:
+# magic, item size (2 or 4), compression, rows in a block, count of rows
+# then offsets of blocks (count of blocks + 1), from the end of the offsets
+PACKED_MAGIC = b'WGFZ'
+PACKED_HEADERS = '>4sBBHI'
+
+COMPRESSIONS = {
+    'none': 0,
+    'zlib': 1,
+    'lzma': 2,
+}
+
+
+class ErrorWGF4Multiplier(Exception):
+
+    def __init__(self, multiplier: int):
+        super().__init__(f'Values don\'t fit int32 with multiplier {multiplier}')
+
+
+def _compress(compression: int, level: int, data: bytes) -> bytes:
+    if compression == COMPRESSIONS['zlib']:
+        return zlib.compress(data, level)
+
+    if compression == COMPRESSIONS['lzma']:
+        return lzma.compress(data, preset=level)
+
+    return data
+
+
+def _decompress(compression: int, data: bytes) -> bytes:
+    if compression == COMPRESSIONS['zlib']:
+        return zlib.decompress(data)
+
+    if compression == COMPRESSIONS['lzma']:
+        return lzma.decompress(data)
+
+    return data
+
+
+def quantize(values: list[float], multiplier: int) -> array:
+    # int16 if it's enough, the minimal value of the type marks NaN and ±inf
+    try:
+        q = list(map(round, map(float(multiplier).__mul__, values)))
+        present = q
+    except (ValueError, OverflowError):
+        try:
+            q = [round(v * multiplier) if math.isfinite(v) else None for v in values]
+        except OverflowError:
+            raise ErrorWGF4Multiplier(multiplier)
+        present = [v for v in q if v is not None]
+
+    lo, hi = min(present, default=0), max(present, default=0)
+
+    if -2 ** 15 < lo and hi < 2 ** 15:
+        typecode, missing = 'h', -2 ** 15
+    elif -2 ** 31 < lo and hi < 2 ** 31:
+        typecode, missing = 'i', -2 ** 31
+    else:
+        raise ErrorWGF4Multiplier(multiplier)
+
+    if present is not q:
+        q = [missing if v is None else v for v in q]
+
+    result = array(typecode, q)
+    if sys.byteorder == 'little':
+        result.byteswap()
+
+    return result
+
 
 class WGF4:
 
-    def __init__(self, loop: asyncio.AbstractEventLoop, workdir: str, d: datetime):
+    filename = 'PRATE.wgf4'
+
+    @property
+    def multiplier(self) -> int:
+        return 1
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, workdir: str, d: datetime,
+                 run: datetime | None = None):
         self._loop = loop
+        self._run = run
         
         datetime_part = datetime.strftime(d, '%d.%m.%Y_%H:00')
         foldername = '%s_%d' % (datetime_part, int(d.timestamp()))
@@ -67,10 +164,10 @@ class WGF4:
         if not os.path.isdir(folderpath):
             os.mkdir(folderpath)
         
-        self._path = os.path.join(folderpath, 'PRATE.wgf4')
+        self._run_path = os.path.join(folderpath, RUN_FILENAME)
+        self._path = os.path.join(folderpath, self.filename)
         self._fp = tempfile.NamedTemporaryFile()
-        headers_size = 7 * 4 + 4
-        self._fp.write(bytes(headers_size))
+        self._fp.write(bytes(HEADERS_SIZE))
 
     def _set_headersers(self, headers: WGF4Headers):
         self._fp.seek(0)
@@ -96,6 +193,195 @@ class WGF4:
     async def write(self, v: float):
         await self._loop.run_in_executor(None, self._write, v)
 
-    def save(self):
+    def _write_values(self, values: list[float]):
+        data = struct.pack(f'>{len(values)}f', *values)
+        self._fp.write(data)
+
+    async def write_values(self, values: list[float]):
+        await self._loop.run_in_executor(None, self._write_values, values)
+
+    def _saved_run(self) -> int | None:
+        try:
+            with open(self._run_path) as fp:
+                return int(fp.read())
+        except (OSError, ValueError):
+            return None
+
+    def save(self) -> bool:
+        # False if the folder has values of a newer run
+        if self._run is not None:
+            saved_run = self._saved_run()
+            if saved_run is not None and saved_run > int(self._run.timestamp()):
+                return False
+
         self._fp.flush()
         shutil.copy(self._fp.name, self._path)
+
+        if self._run is not None:
+            with open(self._run_path, 'w') as fp:
+                fp.write(str(int(self._run.timestamp())))
+
+        return True
+
+
+class WGF4Packed(WGF4):
+    """WGF4 with values quantized by the multiplier to int16/int32.
+
+    Rows are compressed by blocks, the table of offsets gives random
+    access to rows. Values are kept in memory until set_headers.
+    """
+
+    filename = 'PRATE.wgf4z'
+
+    @property
+    def multiplier(self) -> int:
+        return self._multiplier
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, workdir: str, d: datetime,
+                 run: datetime | None = None, compression: str = 'zlib', multiplier: int = 100,
+                 level: int = 1, block_rows: int = 64):
+        super().__init__(loop=loop, workdir=workdir, d=d, run=run)
+        self._multiplier = multiplier
+        self._compression = COMPRESSIONS[compression]
+        self._level = level
+        self._block_rows = block_rows
+        self._values = []
+
+    def _write(self, v: float):
+        self._values.append(v)
+
+    def _write_values(self, values: list[float]):
+        self._values.extend(values)
+
+    def _set_headersers(self, headers: WGF4Headers):
+        super()._set_headersers(headers)
+
+        q = quantize(self._values, headers.multiplier)
+        row_len = headers.latitude
+        rows = len(self._values) // row_len
+        block_len = row_len * self._block_rows
+
+        blocks = [
+            _compress(self._compression, self._level, q[i:i+block_len].tobytes())
+            for i in range(0, rows * row_len, block_len)
+        ]
+
+        offsets = [0]
+        for block in blocks:
+            offsets.append(offsets[-1] + len(block))
+
+        self._fp.write(struct.pack(PACKED_HEADERS, PACKED_MAGIC, q.itemsize,
+                                   self._compression, self._block_rows, rows))
+        self._fp.write(struct.pack(f'>{len(offsets)}Q', *offsets))
+        for block in blocks:
+            self._fp.write(block)
+
+        self._fp.truncate()
+
+
+class WGF4Reader:
+    """Random row access to WGF4 and WGF4Packed files.
+
+    Can be shared among threads. The mmap is unmapped by close()
+    or when the last reference to the reader is gone.
+    """
+
+    @property
+    def headers(self) -> WGF4Headers:
+        return self._headers
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as fp:
+            self._data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self._headers = WGF4Headers.load(self._data)
+        self._row_len = self._headers.latitude
+        self._block = (None, None,)
+
+        packed_size = struct.calcsize(PACKED_HEADERS)
+        packed = self._data[HEADERS_SIZE:HEADERS_SIZE+packed_size]
+        self._packed = packed.startswith(PACKED_MAGIC)
+
+        if self._packed:
+            _, self._itemsize, self._compression, self._block_rows, self._rows = \
+                struct.unpack(PACKED_HEADERS, packed)
+            count = (self._rows + self._block_rows - 1) // self._block_rows + 1
+            offset = HEADERS_SIZE + packed_size
+            self._offsets = struct.unpack_from(f'>{count}Q', self._data, offset)
+            self._blocks_offset = offset + count * 8
+            self._typecode = 'h' if self._itemsize == 2 else 'i'
+            self._missing = -2 ** (self._itemsize * 8 - 1)
+
+        else:
+            self._rows = (len(self._data) - HEADERS_SIZE) // (self._row_len * 4)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self):
+        self._data.close()
+
+    def _load_block(self, index: int) -> array:
+        # The last block is replaced by other threads, so it's read once
+        last_index, last_block = self._block
+        if last_index == index:
+            return last_block
+
+        start = self._blocks_offset + self._offsets[index]
+        end = self._blocks_offset + self._offsets[index+1]
+        data = _decompress(self._compression, self._data[start:end])
+
+        block = array(self._typecode, data)
+        if sys.byteorder == 'little':
+            block.byteswap()
+
+        self._block = (index, block,)
+        return block
+
+    def row(self, index: int) -> list[float]:
+        if not 0 <= index < self._rows:
+            raise IndexError(index)
+
+        if not self._packed:
+            offset = HEADERS_SIZE + index * self._row_len * 4
+            return list(struct.unpack_from(f'>{self._row_len}f', self._data, offset))
+
+        block_index, row_index = divmod(index, self._block_rows)
+        block = self._load_block(block_index)
+        start = row_index * self._row_len
+        multiplier = self._headers.multiplier
+
+        return [
+            float('nan') if v == self._missing else v / multiplier
+            for v in block[start:start+self._row_len]
+        ]
+
+    def value(self, row: int, column: int) -> float:
+        if not 0 <= column < self._row_len:
+            raise IndexError(column)
+
+        if not 0 <= row < self._rows:
+            raise IndexError(row)
+
+        if not self._packed:
+            offset = HEADERS_SIZE + (row * self._row_len + column) * 4
+            return struct.unpack_from('>f', self._data, offset)[0]
+
+        block_index, row_index = divmod(row, self._block_rows)
+        v = self._load_block(block_index)[row_index * self._row_len + column]
+        return float('nan') if v == self._missing else v / self._headers.multiplier
+
+    def values(self, points: list[tuple[int, int]]) -> list[float]:
+        # Gather of many (row, column) points, in the order of the file,
+        # so every block of the packed variant is decoded once
+        result = [0.] * len(points)
+        for k in sorted(range(len(points)), key=points.__getitem__):
+            result[k] = self.value(*points[k])
+
+        return result